@@ -7,9 +7,47 @@
 import pandas as pd
 import numpy as np
 import logging
+import argparse
+import asyncio
+import importlib.machinery
+import json
+import math
+import warnings
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from Interface_selection_excel_et_scores_v2 import ExcelFileSelector 
 
 
+def load_prices(prices_path):
+    """
+    Load stock prices data from the 'stock_prices' sheet of an Excel file.
+    
+    Parameters:
+    - prices_path: Path to the stock prices Excel file
+    
+    Returns:
+    - DataFrame with stock prices
+    """
+    prices_data = pd.read_excel(prices_path, sheet_name="stock_prices")
+    prices_data['Date'] = pd.to_datetime(prices_data['Date'])
+    return prices_data
+
+def load_scores(scores_path):
+    """
+    Load scores data from the 'Versions' sheet of an Excel file.
+    
+    Parameters:
+    - scores_path: Path to the scores Excel file
+    
+    Returns:
+    - DataFrame with scores
+    """
+    scores_data = pd.read_excel(scores_path, sheet_name="Versions")
+    scores_data['Date'] = pd.to_datetime(scores_data['Date'], dayfirst=True)
+    return scores_data
+
 def load_data(prices_path, scores_path):
     """
     Load stock prices and scores data from Excel files.
@@ -22,12 +60,8 @@ def load_data(prices_path, scores_path):
     - Tuple of (prices_data, scores_data)
     """
     try:
-        prices_data = pd.read_excel(prices_path, sheet_name="stock_prices")
-        scores_data = pd.read_excel(scores_path, sheet_name="Versions")
-        
-        # Ensure Date columns are in datetime
-        prices_data['Date'] = pd.to_datetime(prices_data['Date'])
-        scores_data['Date'] = pd.to_datetime(scores_data['Date'], dayfirst=True)
+        prices_data = load_prices(prices_path)
+        scores_data = load_scores(scores_path)
         
         return prices_data, scores_data
     except Exception as e:
@@ -60,12 +94,13 @@ def calculate_ponderation(scores_df, seuil):
     
     return scores_df
 
-def clean_price_data(prices_data):
+def clean_price_data(prices_data, benchmark='CAC 40'):
     """
     Cleans a price dataframe by filling missing values with the previous day's price.
     
     Parameters:
     - prices_data: DataFrame containing stock prices
+    - benchmark: Benchmark column name (or list of names) left unfilled (default 'CAC 40')
     
     Returns:
     - Cleaned DataFrame with filled missing values
@@ -76,8 +111,9 @@ def clean_price_data(prices_data):
     # Ensure the DataFrame is sorted by date
     prices_data_clean = prices_data_clean.sort_values('Date')
     
-    # Get all columns except 'Date'
-    price_columns = [col for col in prices_data_clean.columns if (col != 'Date') & (col != 'CAC 40')]
+    # Get all columns except 'Date' and the benchmark(s)
+    benchmarks = [benchmark] if isinstance(benchmark, str) else list(benchmark)
+    price_columns = [col for col in prices_data_clean.columns if (col != 'Date') & (col not in benchmarks)]
     
     # For each price column, forward fill missing values
     for column in price_columns:
@@ -86,7 +122,7 @@ def clean_price_data(prices_data):
     
     return prices_data_clean
 
-def calculate_complete_smart_cac(prices_df, scores_df, seuil=125, verbose=True):
+def calculate_complete_smart_cac(prices_df, scores_df, seuil=125, verbose=True, benchmark='CAC 40'):
     """
     Calculate the SMART CAC40 index with comprehensive tracking and analysis.
     
@@ -95,6 +131,7 @@ def calculate_complete_smart_cac(prices_df, scores_df, seuil=125, verbose=True):
     - scores_df: DataFrame with company scores
     - seuil: Threshold for score-based weighting (default 125)
     - verbose: If True, prints detailed logging information
+    - benchmark: Benchmark column of prices_df the index starts from (default 'CAC 40')
     
     Returns:
     - Dictionary with detailed calculation results
@@ -129,9 +166,10 @@ def calculate_complete_smart_cac(prices_df, scores_df, seuil=125, verbose=True):
         companies_details = high_score_companies[['SYMBOLE', 'SCORE', 'Ponderation']].to_dict('records')
         
         # Print companies for each version
-        print(f"\nCompanies in version {version_date} (Threshold {seuil}):")
-        for company in companies_details:
-            print(f"Symbol: {company['SYMBOLE']}, Score: {company['SCORE']}, Weight: {company['Ponderation']:.4f}")
+        if verbose:
+            print(f"\nCompanies in version {version_date} (Threshold {seuil}):")
+            for company in companies_details:
+                print(f"Symbol: {company['SYMBOLE']}, Score: {company['SCORE']}, Weight: {company['Ponderation']:.4f}")
         
         version_companies[str(version_date)] = {
             'symbols': companies,
@@ -142,7 +180,7 @@ def calculate_complete_smart_cac(prices_df, scores_df, seuil=125, verbose=True):
     # Prepare result DataFrame
     all_dates = prices_df['Date'].sort_values().unique()
     result_df = pd.DataFrame({'Date': all_dates})
-    result_df['CAC 40'] = result_df['Date'].map(dict(zip(prices_df['Date'], prices_df['CAC 40'])))
+    result_df[benchmark] = result_df['Date'].map(dict(zip(prices_df['Date'], prices_df[benchmark])))
     result_df['SMART CAC40'] = 0.0
     result_df['Version'] = None
     result_df['Total_Variation'] = 0.0
@@ -177,7 +215,7 @@ def calculate_complete_smart_cac(prices_df, scores_df, seuil=125, verbose=True):
         
         # Determine base value and reference date
         if last_smart_cac is None:
-            base_value = result_df.loc[version_mask, 'CAC 40'].iloc[0]
+            base_value = result_df.loc[version_mask, benchmark].iloc[0]
             reference_date = version_rows['Date'].iloc[0]
         else:
             base_value = last_smart_cac
@@ -231,7 +269,7 @@ def calculate_complete_smart_cac(prices_df, scores_df, seuil=125, verbose=True):
             last_smart_cac = result_df.loc[version_rows.index[-1], 'SMART CAC40']
     
     # Final DataFrame and calculations
-    final_df = result_df[['Date', 'CAC 40', 'SMART CAC40', 'Total_Variation']]
+    final_df = result_df[['Date', benchmark, 'SMART CAC40', 'Total_Variation']]
     
     smart_cac40_values = final_df['SMART CAC40']
     first_smart_cac = final_df['SMART CAC40'].iloc[0]
@@ -253,6 +291,169 @@ def calculate_complete_smart_cac(prices_df, scores_df, seuil=125, verbose=True):
     }
 
 
+def normalise_chunk_dates(chunk, tz=None):
+    """
+    Parse the 'Date' column of a price chunk into timezone-naive datetimes.
+    
+    Naive dates are kept unchanged. Dates with a UTC offset are converted to the
+    wall-clock time of tz (default: UTC) and made timezone-naive, so they compare
+    with the naive version dates of the scores.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        try:
+            dates = pd.to_datetime(chunk['Date'])
+        except ValueError:
+            dates = None
+    if dates is None or dates.dtype == object:
+        # Mixed UTC offsets, e.g. across DST changes
+        dates = pd.to_datetime(chunk['Date'], utc=True)
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert(tz or 'UTC').dt.tz_localize(None)
+    chunk['Date'] = dates
+    return chunk
+
+def read_price_chunks(prices_path, chunksize=500000, tz=None):
+    """
+    Read intraday stock prices in time-ordered chunks from a CSV or Parquet file.
+    
+    Parameters:
+    - prices_path: Path to a .csv or .parquet file with a 'Date' column
+    - chunksize: Number of rows per chunk (default 500000)
+    - tz: Timezone whose wall-clock time is kept for dates with a UTC offset,
+      e.g. 'Europe/Paris' (default: UTC); naive dates are not shifted
+    
+    Returns:
+    - Generator of DataFrames with stock prices
+    """
+    if str(prices_path).lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        
+        parquet_file = pq.ParquetFile(prices_path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield normalise_chunk_dates(batch.to_pandas(), tz)
+    else:
+        with pd.read_csv(prices_path, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield normalise_chunk_dates(chunk, tz)
+
+def calculate_smart_cac_stream(price_chunks, scores_df, seuil=125, verbose=True, benchmark='CAC 40'):
+    """
+    Calculate the SMART CAC40 index chunk by chunk on time-ordered price data.
+    
+    Uses the same chaining rules as calculate_complete_smart_cac, while only
+    keeping the forward-fill state, the version reference prices and the last
+    index value between chunks, so memory stays bounded by the chunk size.
+    
+    Parameters:
+    - price_chunks: Iterable of price DataFrames in increasing Date order
+    - scores_df: DataFrame with company scores
+    - seuil: Threshold for score-based weighting (default 125)
+    - verbose: If True, prints detailed logging information
+    - benchmark: Benchmark column the index starts from (default 'CAC 40')
+    
+    Returns:
+    - Generator of DataFrames with Date, benchmark, SMART CAC40 and Total_Variation
+    """
+    logging.basicConfig(
+        level=logging.INFO if verbose else logging.WARNING,
+        format='%(asctime)s - %(levelname)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    logger = logging.getLogger(__name__)
+    
+    logger.info(f"Starting streaming SMART CAC40 Calculation with Threshold: {seuil}")
+    
+    # Prepare score weighting and per-version symbols
+    scores_with_pond = calculate_ponderation(scores_df, seuil)
+    version_dates = np.sort(scores_with_pond['Date'].unique())
+    version_weights = []
+    for version_date in version_dates:
+        current_scores = scores_with_pond[scores_with_pond['Date'] == version_date]
+        high_score = current_scores[current_scores['SCORE'] >= seuil]
+        version_weights.append(high_score.set_index('SYMBOLE')['Ponderation'])
+    
+    logger.info(f"Number of Versions Detected: {len(version_dates)}")
+    
+    # State carried across chunks
+    carry_prices = None
+    previous_row = None
+    last_date = None
+    current_version = -1
+    base_value = None
+    last_smart_cac = None
+    symbols = []
+    weights = np.array([])
+    reference_prices = np.array([])
+    
+    for chunk_number, chunk in enumerate(price_chunks):
+        if getattr(chunk['Date'].dtype, 'tz', None) is not None:
+            raise ValueError(f"Chunk {chunk_number}: timezone-aware dates are not supported, "
+                             f"normalise them first (see normalise_chunk_dates)")
+        chunk = chunk.sort_values('Date', kind='stable').drop_duplicates('Date', keep='first')
+        if last_date is not None:
+            late_rows = chunk['Date'] <= last_date
+            if late_rows.any():
+                logger.warning(f"Chunk {chunk_number}: skipping {late_rows.sum()} rows not after {last_date}")
+                chunk = chunk[~late_rows]
+        if chunk.empty:
+            continue
+        chunk = chunk.reset_index(drop=True)
+        
+        # Forward fill, continuing from the previous chunk
+        price_columns = [col for col in chunk.columns if (col != 'Date') & (col != benchmark)]
+        chunk[price_columns] = chunk[price_columns].ffill()
+        if carry_prices is not None:
+            chunk[price_columns] = chunk[price_columns].fillna(carry_prices.reindex(price_columns))
+        
+        dates = chunk['Date'].to_numpy()
+        row_versions = np.searchsorted(version_dates, dates, side='right') - 1
+        
+        smart_values = np.zeros(len(chunk))
+        total_variations = np.zeros(len(chunk))
+        
+        # Process each run of consecutive rows sharing a version
+        run_starts = np.flatnonzero(np.diff(row_versions)) + 1
+        run_bounds = zip(np.r_[0, run_starts], np.r_[run_starts, len(chunk)])
+        for start, end in run_bounds:
+            version = row_versions[start]
+            if version >= 0:
+                if version != current_version:
+                    # New version: chain from the last value and previous row
+                    logger.info(f"Processing Version: {version_dates[version]}")
+                    current_version = version
+                    symbols = [symbol for symbol in version_weights[version].index if symbol in chunk.columns]
+                    weights = version_weights[version].reindex(symbols).to_numpy(dtype=float)
+                    if last_smart_cac is None:
+                        base_value = chunk[benchmark].iloc[start]
+                        reference_row = chunk.iloc[start]
+                    else:
+                        base_value = last_smart_cac
+                        reference_row = chunk.iloc[start - 1] if start > 0 else previous_row
+                    reference_prices = reference_row.reindex(symbols).to_numpy(dtype=float)
+                
+                # Weighted total variation, skipping invalid prices
+                current_prices = chunk[symbols].iloc[start:end].to_numpy(dtype=float)
+                valid = ~np.isnan(current_prices) & ~np.isnan(reference_prices) & (reference_prices != 0)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    variations = (current_prices / reference_prices - 1) * 100 * weights
+                total_var = np.where(valid, variations, 0.0).sum(axis=1)
+                
+                total_variations[start:end] = total_var
+                smart_values[start:end] = base_value * (1 + total_var / 100)
+                last_smart_cac = smart_values[end - 1]
+        
+        carry_prices = chunk[price_columns].iloc[-1]
+        previous_row = chunk.iloc[-1]
+        last_date = chunk['Date'].iloc[-1]
+        
+        yield pd.DataFrame({
+            'Date': chunk['Date'],
+            benchmark: chunk[benchmark],
+            'SMART CAC40': smart_values,
+            'Total_Variation': total_variations
+        })
+
 IN_COLAB = False
 try:
     from google.colab import files
@@ -319,5 +520,526 @@ def run_analysis(data_paths):
         logging.error(f"An error occurred: {e}")
         return None
 
+# Cleaned prices and scores shared with the run_universes worker processes
+UNIVERSE_WORKER_DATA = {}
+
+def init_universe_worker(prices_by_path, scores_by_path):
+    """Store the shared DataFrames once in each run_universes worker process."""
+    UNIVERSE_WORKER_DATA['prices'] = prices_by_path
+    UNIVERSE_WORKER_DATA['scores'] = scores_by_path
+
+def run_universe_threshold(prices_path, scores_path, seuil, benchmark):
+    """Run one (universe, threshold) calculation inside a run_universes worker process."""
+    return calculate_complete_smart_cac(
+        UNIVERSE_WORKER_DATA['prices'][prices_path],
+        UNIVERSE_WORKER_DATA['scores'][scores_path],
+        seuil=seuil,
+        verbose=False,
+        benchmark=benchmark
+    )
+
+def workers_can_import_module(mp_context=None):
+    """
+    Check that worker processes can import this module to run run_universe_threshold.
+    
+    Forked workers inherit it, and spawned workers re-run the main script by
+    path. Otherwise spawned workers import it by name from sys.path, which fails
+    when it was loaded under an alias (its file name has spaces).
+    """
+    start_method = mp_context.get_start_method() if mp_context is not None else multiprocessing.get_start_method()
+    if start_method == 'fork' or __name__ == '__main__':
+        return True
+    return importlib.machinery.PathFinder.find_spec(__name__) is not None
+
+def run_universes(universes, max_workers=None, mp_context=None):
+    """
+    Run the threshold analysis on several benchmark universes in one batch.
+    
+    Each workbook is read from disk and cleaned only once, even when several
+    universes share it. The (universe, threshold) calculations run in parallel
+    in a pool of worker processes. Each worker receives a copy of all cleaned
+    DataFrames at startup, so their memory is multiplied by the number of
+    workers. When the workers cannot import this module (spawn start method
+    with the script loaded under an alias), the calculations run serially.
+    
+    Parameters:
+    - universes: List of dicts with keys 'name', 'prices_path', 'scores_path',
+      'thresholds' and optionally 'benchmark' (default 'CAC 40'); names must be unique
+    - max_workers: Maximum number of worker processes (default: number of CPUs);
+      1 runs serially in the current process
+    - mp_context: multiprocessing context for the worker processes (default: the
+      platform default start method)
+    
+    Returns:
+    - Dictionary with per-run results keyed by (name, seuil), the errors of
+      failed runs keyed the same way, the combined index DataFrame and a
+      summary DataFrame of total period variations
+    
+    Raises RuntimeError when every run fails.
+    """
+    names = [universe['name'] for universe in universes]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate universe names: {', '.join(map(str, duplicates))}")
+    
+    # Benchmarks used per price workbook, so that none of them is forward filled
+    benchmarks_by_path = {}
+    for universe in universes:
+        benchmark = universe.get('benchmark', 'CAC 40')
+        benchmarks_by_path.setdefault(universe['prices_path'], [])
+        if benchmark not in benchmarks_by_path[universe['prices_path']]:
+            benchmarks_by_path[universe['prices_path']].append(benchmark)
+    
+    # Load and clean each price workbook once
+    prices_by_path = {}
+    for prices_path, benchmarks in benchmarks_by_path.items():
+        logging.info(f"Loading prices: {prices_path}")
+        prices_by_path[prices_path] = clean_price_data(load_prices(prices_path), benchmark=benchmarks)
+    
+    # Load each Versions sheet once
+    scores_by_path = {}
+    for universe in universes:
+        if universe['scores_path'] not in scores_by_path:
+            logging.info(f"Loading scores: {universe['scores_path']}")
+            scores_by_path[universe['scores_path']] = load_scores(universe['scores_path'])
+    
+    jobs = {}
+    for universe in universes:
+        for seuil in universe['thresholds']:
+            jobs[(universe['name'], seuil)] = (
+                universe['prices_path'],
+                universe['scores_path'],
+                seuil,
+                universe.get('benchmark', 'CAC 40')
+            )
+    
+    results = {}
+    errors = {}
+    parallel = max_workers != 1 and workers_can_import_module(mp_context)
+    if max_workers != 1 and not parallel:
+        logging.warning("Worker processes cannot import this module, running the universes serially")
+    
+    if parallel:
+        # Run every threshold sweep in parallel worker processes
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=mp_context,
+                                 initializer=init_universe_worker,
+                                 initargs=(prices_by_path, scores_by_path)) as executor:
+            futures = {key: executor.submit(run_universe_threshold, *job) for key, job in jobs.items()}
+            for (name, seuil), future in futures.items():
+                try:
+                    results[(name, seuil)] = future.result()
+                except Exception as e:
+                    logging.error(f"Universe {name} failed with threshold {seuil}: {e}")
+                    errors[(name, seuil)] = e
+    else:
+        for (name, seuil), (prices_path, scores_path, _, benchmark) in jobs.items():
+            try:
+                results[(name, seuil)] = calculate_complete_smart_cac(
+                    prices_by_path[prices_path], scores_by_path[scores_path],
+                    seuil=seuil, verbose=False, benchmark=benchmark
+                )
+            except Exception as e:
+                logging.error(f"Universe {name} failed with threshold {seuil}: {e}")
+                errors[(name, seuil)] = e
+    
+    if jobs and not results:
+        first_error = next(iter(errors.values()))
+        raise RuntimeError(f"All {len(jobs)} universe runs failed, first error: {first_error!r}") from first_error
+    
+    # Combine results into one long DataFrame
+    frames = []
+    summary_rows = []
+    for universe in universes:
+        benchmark = universe.get('benchmark', 'CAC 40')
+        for seuil in universe['thresholds']:
+            if (universe['name'], seuil) not in results:
+                continue
+            result = results[(universe['name'], seuil)]
+            frame = result['dataframe'].rename(columns={benchmark: 'Benchmark'})
+            frame.insert(0, 'Seuil', seuil)
+            frame.insert(0, 'Universe', universe['name'])
+            frames.append(frame)
+            summary_rows.append({
+                'Universe': universe['name'],
+                'Benchmark': benchmark,
+                'Seuil': seuil,
+                'Total_Period_Variation': result['total_period_variation']
+            })
+    
+    combined_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    summary_df = pd.DataFrame(summary_rows)
+    
+    print("\n--- Universe Comparison ---")
+    for row in summary_rows:
+        print(f"{row['Universe']} - Threshold {row['Seuil']}: Total Period Variation = {row['Total_Period_Variation']:.4f}%")
+    for (name, seuil), error in errors.items():
+        print(f"{name} - Threshold {seuil}: FAILED ({error})")
+    
+    return {
+        'results': results,
+        'errors': errors,
+        'dataframe': combined_df,
+        'summary': summary_df
+    }
+
+def to_json_safe(value):
+    """Recursively replace non-finite floats (inf, NaN) with None so the value is valid JSON."""
+    if isinstance(value, dict):
+        return {key: to_json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+class SmartCacService:
+    """
+    Long-lived local service answering SMART CAC40 threshold requests over HTTP.
+    
+    Workbooks loaded through load_data are kept in memory with LRU eviction, so
+    repeated requests on the same workbook skip the Excel parsing; the prices
+    cleaned by clean_price_data are kept per benchmark, and the results of the
+    last max_results (benchmark, threshold) pairs per workbook. Requests are
+    JSON objects with the same keys as the ExcelFileSelector result
+    ('prices_path', 'scores_path', 'thresholds'), plus an optional 'benchmark',
+    sent with POST /smart.
+    
+    Requests are served concurrently and cached results are answered at once,
+    but new calculations run in a thread pool: calculate_complete_smart_cac
+    holds the GIL, so uncached thresholds are in practice computed one at a time.
+    """
+    
+    def __init__(self, max_datasets=4, max_results=16, max_workers=None, request_timeout=30):
+        self.max_datasets = max_datasets
+        self.max_results = max_results
+        self.request_timeout = request_timeout
+        self.datasets = OrderedDict()
+        self.loading = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+    
+    def dataset_key(self, prices_path, scores_path):
+        # Modification times are part of the key so that edited workbooks are reloaded
+        return (
+            os.path.abspath(prices_path), os.path.getmtime(prices_path),
+            os.path.abspath(scores_path), os.path.getmtime(scores_path)
+        )
+    
+    def load_dataset(self, prices_path, scores_path):
+        prices_data, scores_data = load_data(prices_path, scores_path)
+        return {
+            'prices': prices_data,
+            'scores': scores_data,
+            'cleaned': {},
+            'results': OrderedDict()
+        }
+    
+    async def get_dataset(self, prices_path, scores_path, benchmark):
+        key = self.dataset_key(prices_path, scores_path)
+        if key in self.datasets:
+            dataset = self.datasets[key]
+        else:
+            # Concurrent requests for the same workbook share a single load
+            if key not in self.loading:
+                logging.info(f"Loading dataset: {prices_path}")
+                loop = asyncio.get_running_loop()
+                self.loading[key] = loop.run_in_executor(
+                    self.executor, self.load_dataset, prices_path, scores_path
+                )
+            try:
+                dataset = await self.loading[key]
+            finally:
+                self.loading.pop(key, None)
+        
+        # Only workbooks with the requested benchmark enter the cache
+        if benchmark not in dataset['prices'].columns:
+            raise ValueError(f"Unknown benchmark column: {benchmark!r}")
+        
+        self.datasets[key] = dataset
+        self.datasets.move_to_end(key)
+        while len(self.datasets) > self.max_datasets:
+            evicted_key, _ = self.datasets.popitem(last=False)
+            logging.info(f"Evicting dataset: {evicted_key[0]}")
+        return dataset
+    
+    async def get_clean_prices(self, dataset, benchmark):
+        if benchmark not in dataset['cleaned']:
+            loop = asyncio.get_running_loop()
+            dataset['cleaned'][benchmark] = loop.run_in_executor(
+                self.executor, lambda: clean_price_data(dataset['prices'], benchmark=benchmark)
+            )
+        return await dataset['cleaned'][benchmark]
+    
+    async def calculate(self, dataset, seuil, benchmark):
+        results = dataset['results']
+        key = (benchmark, seuil)
+        if key in results:
+            results.move_to_end(key)
+            calculation = results[key]
+        else:
+            prices = await self.get_clean_prices(dataset, benchmark)
+            loop = asyncio.get_running_loop()
+            calculation = loop.run_in_executor(
+                self.executor,
+                lambda: calculate_complete_smart_cac(
+                    prices, dataset['scores'], seuil=seuil, verbose=False, benchmark=benchmark
+                )
+            )
+            results[key] = calculation
+            while len(results) > self.max_results:
+                results.popitem(last=False)
+        try:
+            return await calculation
+        except Exception:
+            if results.get(key) is calculation:
+                del results[key]
+            raise
+    
+    async def handle_smart(self, request):
+        prices_path = request['prices_path']
+        scores_path = request.get('scores_path', prices_path)
+        benchmark = request.get('benchmark', 'CAC 40')
+        thresholds = request['thresholds']
+        if not isinstance(benchmark, str):
+            raise ValueError("'benchmark' must be a string")
+        if (not isinstance(thresholds, list) or not thresholds
+                or not all(isinstance(seuil, (int, float)) and not isinstance(seuil, bool) for seuil in thresholds)):
+            raise ValueError("'thresholds' must be a non-empty list of numbers")
+        thresholds = [float(seuil) for seuil in thresholds]
+        
+        dataset = await self.get_dataset(prices_path, scores_path, benchmark)
+        results = await asyncio.gather(
+            *(self.calculate(dataset, seuil, benchmark) for seuil in thresholds)
+        )
+        
+        return {
+            'results': [
+                {
+                    'seuil': result['seuil'],
+                    'total_period_variation': result['total_period_variation'],
+                    'version_companies': result['version_companies'],
+                    'dataframe': json.loads(result['dataframe'].to_json(orient='records', date_format='iso'))
+                }
+                for result in results
+            ]
+        }
+    
+    async def read_request(self, reader):
+        """Read the request line, headers and body of one HTTP request."""
+        request_line = (await reader.readline()).decode('latin-1').split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        content_length = headers.get('content-length', '0')
+        if not content_length.isdigit():
+            raise ValueError(f"Invalid Content-Length: {content_length!r}")
+        body = await reader.readexactly(int(content_length))
+        return request_line, headers, body
+    
+    async def handle_connection(self, reader, writer):
+        status, response = 200, None
+        try:
+            try:
+                request_line, headers, body = await asyncio.wait_for(self.read_request(reader), self.request_timeout)
+            except asyncio.TimeoutError:
+                status, response = 408, {'error': 'Request timeout'}
+            except (asyncio.IncompleteReadError, ValueError) as e:
+                status, response = 400, {'error': str(e) or 'Incomplete request'}
+            else:
+                if len(request_line) < 2:
+                    status, response = 400, {'error': 'Malformed request'}
+                elif request_line[:2] == ['GET', '/datasets']:
+                    response = {'datasets': [
+                        {'prices_path': key[0], 'scores_path': key[2], 'benchmarks': list(dataset['cleaned']),
+                         'results': [list(result_key) for result_key in dataset['results']]}
+                        for key, dataset in self.datasets.items()
+                    ]}
+                elif request_line[:2] == ['POST', '/smart']:
+                    try:
+                        response = await self.handle_smart(json.loads(body or b'{}'))
+                    except (KeyError, TypeError, ValueError, OSError) as e:
+                        status, response = 400, {'error': f"{type(e).__name__}: {e}"}
+                else:
+                    status, response = 404, {'error': 'Not found'}
+        except Exception as e:
+            logging.error(f"Error handling request : {e}")
+            status, response = 500, {'error': str(e)}
+        
+        payload = json.dumps(to_json_safe(response), allow_nan=False).encode('utf-8')
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 408: 'Request Timeout',
+                  500: 'Internal Server Error'}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+    
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        """Start listening on a TCP port, or on a Unix socket if unix_path is given."""
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+            logging.info(f"SMART CAC40 service listening on {unix_path}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            logging.info(f"SMART CAC40 service listening on http://{host}:{port}")
+        return server
+
+def serve(host='127.0.0.1', port=8765, unix_path=None, max_datasets=4, max_results=16):
+    """
+    Run the SMART CAC40 service until interrupted.
+    
+    Parameters:
+    - host: Interface to listen on (default 127.0.0.1)
+    - port: TCP port to listen on (default 8765)
+    - unix_path: Path of a Unix socket to listen on instead of TCP
+    - max_datasets: Number of workbooks kept warm in memory (default 4)
+    - max_results: Number of threshold results kept per workbook (default 16)
+    """
+    logging.basicConfig(level=logging.INFO, 
+                        format='%(asctime)s - %(levelname)s: %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+    
+    async def run_forever():
+        service = SmartCacService(max_datasets=max_datasets, max_results=max_results)
+        server = await service.start(host, port, unix_path)
+        async with server:
+            await server.serve_forever()
+    
+    try:
+        asyncio.run(run_forever())
+    except KeyboardInterrupt:
+        logging.info("SMART CAC40 service stopped")
+
+async def query_service_async(data_paths, host='127.0.0.1', port=8765, unix_path=None):
+    """
+    Send a threshold request to a running SMART CAC40 service.
+    
+    Parameters:
+    - data_paths: Dictionary as returned by ExcelFileSelector.run(), optionally with 'benchmark'
+    - host, port, unix_path: Address of the service
+    
+    Returns:
+    - Decoded JSON response
+    """
+    request = {key: data_paths[key] for key in ('prices_path', 'scores_path', 'thresholds', 'benchmark') if key in data_paths}
+    body = json.dumps(request).encode('utf-8')
+    
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"POST /smart HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    
+    status_line, _, rest = response.partition(b"\r\n")
+    _, _, payload = rest.partition(b"\r\n\r\n")
+    result = json.loads(payload)
+    if int(status_line.split()[1]) != 200:
+        raise RuntimeError(result.get('error', status_line.decode('latin-1')))
+    return result
+
+def query_service(data_paths, host='127.0.0.1', port=8765, unix_path=None):
+    """Blocking wrapper around query_service_async."""
+    return asyncio.run(query_service_async(data_paths, host, port, unix_path))
+
+def check_service(prices_path, scores_path=None, thresholds=(125,), benchmark='CAC 40'):
+    """
+    End-to-end check of the service: start it on a free local port, query it
+    with query_service_async and compare with a direct calculation.
+    
+    Parameters:
+    - prices_path: Path to the stock prices Excel file
+    - scores_path: Path to the scores Excel file (default: prices_path)
+    - thresholds: Thresholds to request (default (125,))
+    - benchmark: Benchmark column (default 'CAC 40')
+    
+    Returns:
+    - Decoded JSON response of the service
+    """
+    scores_path = scores_path or prices_path
+    data_paths = {
+        'prices_path': prices_path,
+        'scores_path': scores_path,
+        'thresholds': list(thresholds),
+        'benchmark': benchmark
+    }
+    
+    async def run_check():
+        service = SmartCacService()
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            # Same request twice: cold load, then served from the warm cache
+            cold = await query_service_async(data_paths, port=port)
+            warm = await query_service_async(data_paths, port=port)
+        return cold, warm
+    
+    cold, warm = asyncio.run(run_check())
+    if cold != warm:
+        raise AssertionError("Warm cache response differs from the cold response")
+    
+    prices_data, scores_data = load_data(prices_path, scores_path)
+    prices_data_clean = clean_price_data(prices_data, benchmark=benchmark)
+    for seuil, served in zip(thresholds, cold['results']):
+        expected = calculate_complete_smart_cac(prices_data_clean, scores_data, seuil=float(seuil),
+                                                verbose=False, benchmark=benchmark)
+        served_values = np.array([row['SMART CAC40'] for row in served['dataframe']], dtype=float)
+        if not np.allclose(served_values, expected['smart_cac40_values'].to_numpy(dtype=float), equal_nan=True):
+            raise AssertionError(f"Service result differs from direct calculation for threshold {seuil}")
+    
+    print(f"Service check passed for thresholds {list(thresholds)}")
+    return cold
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="SMART CAC40 index with several score thresholds", allow_abbrev=False)
+    parser.add_argument('--serve', action='store_true', help="run the long-lived computation service")
+    parser.add_argument('--host', default='127.0.0.1', help="service interface (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="service TCP port (default 8765)")
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--max-datasets', type=int, default=4, help="workbooks kept warm in memory (default 4)")
+    parser.add_argument('--max-results', type=int, default=16, help="threshold results kept per workbook (default 16)")
+    parser.add_argument('--check-service', metavar='WORKBOOK', help="run the end-to-end service check on a prices workbook")
+    parser.add_argument('--scores', metavar='PATH', help="scores workbook for --check-service (default: the prices workbook)")
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[125], help="thresholds for --check-service")
+    parser.add_argument('--universes', metavar='CONFIG', help="run the batch of universes listed in a JSON file")
+    parser.add_argument('--output', metavar='CSV', help="write the combined --universes result to a CSV file")
+    # Unknown arguments are ignored, e.g. the kernel's "-f ...json" under Colab/Jupyter
+    args, _ = parser.parse_known_args()
+    
+    if args.universes:
+        logging.basicConfig(level=logging.INFO, 
+                            format='%(asctime)s - %(levelname)s: %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S')
+        with open(args.universes, encoding='utf-8') as config_file:
+            batch = run_universes(json.load(config_file))
+        if args.output:
+            batch['dataframe'].to_csv(args.output, index=False)
+    elif args.check_service:
+        check_service(args.check_service, scores_path=args.scores, thresholds=args.thresholds)
+    elif args.serve:
+        serve(host=args.host, port=args.port, unix_path=args.unix,
+              max_datasets=args.max_datasets, max_results=args.max_results)
+    else:
+        main()
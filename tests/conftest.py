@@ -0,0 +1,72 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = ROOT / "calcul smart cac 40 plusieurs versions_v2.py"
+
+
+@pytest.fixture(scope="session")
+def smart():
+    """The calculation script, loaded under an importable alias (its file name has spaces)."""
+    pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    # The script imports the ExcelFileSelector UI, which needs tkinter outside Colab
+    pytest.importorskip("tkinter")
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    if "smart_cac" not in sys.modules:
+        spec = importlib.util.spec_from_file_location("smart_cac", SCRIPT)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["smart_cac"] = module
+        spec.loader.exec_module(module)
+    return sys.modules["smart_cac"]
+
+
+@pytest.fixture
+def prices_data():
+    """60 business days of prices for two benchmarks and five symbols, with gaps."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2023-01-02", periods=60)
+    prices = pd.DataFrame({
+        "Date": dates,
+        "CAC 40": 7000 + rng.normal(0, 20, 60).cumsum(),
+        "SBF 120": 5000 + rng.normal(0, 20, 60).cumsum(),
+    })
+    for symbol in "ABCDE":
+        prices[symbol] = 100 + rng.normal(0, 1, 60).cumsum()
+    prices.loc[5, "A"] = np.nan
+    prices.loc[19:21, "B"] = np.nan
+    return prices
+
+
+@pytest.fixture
+def scores_data(prices_data):
+    """Three versions of scores; the first starts on the fourth price date."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(1)
+    version_dates = prices_data["Date"].iloc[[3, 20, 40]]
+    return pd.DataFrame([
+        {"Date": date, "SYMBOLE": symbol, "SCORE": int(rng.integers(80, 180))}
+        for date in version_dates
+        for symbol in "ABCDE"
+    ])
+
+
+@pytest.fixture
+def workbooks(tmp_path, prices_data, scores_data):
+    """Separate prices ('stock_prices') and scores ('Versions') workbooks."""
+    prices_path = tmp_path / "prices.xlsx"
+    scores_path = tmp_path / "scores.xlsx"
+    prices_data.to_excel(prices_path, sheet_name="stock_prices", index=False)
+    scores = scores_data.copy()
+    scores["Date"] = scores["Date"].dt.strftime("%d/%m/%Y")
+    scores.to_excel(scores_path, sheet_name="Versions", index=False)
+    return str(prices_path), str(scores_path)
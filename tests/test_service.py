@@ -0,0 +1,137 @@
+import asyncio
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import ROOT, SCRIPT
+
+
+def run_with_service(smart, scenario, **service_options):
+    """Start SmartCacService on a free port and run scenario(service, port) against it."""
+    async def run():
+        service = smart.SmartCacService(**service_options)
+        server = await service.start(port=0)
+        async with server:
+            return await scenario(service, server.sockets[0].getsockname()[1])
+    return asyncio.run(run())
+
+
+async def raw_request(port, data):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), payload
+
+
+def post_smart(request):
+    body = json.dumps(request).encode("utf-8")
+    return b"POST /smart HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+
+
+def test_service_round_trip_cold_then_warm(smart, workbooks, prices_data, scores_data):
+    prices_path, scores_path = workbooks
+    data_paths = {"prices_path": prices_path, "scores_path": scores_path, "thresholds": [100, 125]}
+
+    async def scenario(service, port):
+        cold = await smart.query_service_async(data_paths, port=port)
+        warm = await smart.query_service_async(data_paths, port=port)
+        status, payload = await raw_request(port, post_smart(data_paths))
+        return cold, warm, status, payload
+
+    cold, warm, status, payload = run_with_service(smart, scenario)
+
+    assert cold == warm
+    assert status == 200
+    # Prices start before the first version, so the total variation is inf: sent as null
+    assert b"Infinity" not in payload and b"NaN" not in payload
+    assert cold["results"][0]["total_period_variation"] is None
+
+    for seuil, served in zip([100, 125], cold["results"]):
+        expected = smart.calculate_complete_smart_cac(smart.clean_price_data(prices_data), scores_data,
+                                                      seuil=seuil, verbose=False)
+        served_values = np.array([row["SMART CAC40"] for row in served["dataframe"]], dtype=float)
+        assert np.allclose(served_values, expected["smart_cac40_values"].to_numpy(dtype=float))
+
+
+def test_service_shares_one_dataset_across_benchmarks(smart, workbooks):
+    prices_path, scores_path = workbooks
+
+    async def scenario(service, port):
+        for benchmark in ("CAC 40", "SBF 120"):
+            await smart.query_service_async({"prices_path": prices_path, "scores_path": scores_path,
+                                             "thresholds": [110], "benchmark": benchmark}, port=port)
+        return service
+
+    service = run_with_service(smart, scenario)
+    assert len(service.datasets) == 1
+    dataset = next(iter(service.datasets.values()))
+    assert sorted(dataset["cleaned"]) == ["CAC 40", "SBF 120"]
+
+
+@pytest.mark.parametrize("override", [
+    {"thresholds": "125"},
+    {"thresholds": []},
+    {"thresholds": [True]},
+    {"benchmark": "UNKNOWN"},
+    {"prices_path": "missing.xlsx"},
+])
+def test_service_rejects_bad_requests(smart, workbooks, override):
+    prices_path, scores_path = workbooks
+    request = {"prices_path": prices_path, "scores_path": scores_path, "thresholds": [125], **override}
+
+    async def scenario(service, port):
+        status, _ = await raw_request(port, post_smart(request))
+        return status, service
+
+    status, service = run_with_service(smart, scenario)
+    assert status == 400
+    assert len(service.datasets) == 0
+
+
+@pytest.mark.parametrize("content_length", [b"abc", b"-5"])
+def test_service_rejects_invalid_content_length(smart, content_length):
+    async def scenario(service, port):
+        return await raw_request(port, b"POST /smart HTTP/1.1\r\nContent-Length: " + content_length + b"\r\n\r\n")
+
+    status, _ = run_with_service(smart, scenario)
+    assert status == 400
+
+
+def test_service_times_out_silent_clients(smart):
+    async def scenario(service, port):
+        return await raw_request(port, b"")
+
+    status, _ = run_with_service(smart, scenario, request_timeout=0.2)
+    assert status == 408
+
+
+def test_service_bounds_results_per_dataset(smart, workbooks):
+    prices_path, scores_path = workbooks
+
+    async def scenario(service, port):
+        for thresholds in ([100], [110], [120, 130]):
+            await smart.query_service_async({"prices_path": prices_path, "scores_path": scores_path,
+                                             "thresholds": thresholds}, port=port)
+        return service
+
+    service = run_with_service(smart, scenario, max_results=2)
+    dataset = next(iter(service.datasets.values()))
+    assert list(dataset["results"]) == [("CAC 40", 120.0), ("CAC 40", 130.0)]
+
+
+def test_check_service_cli_with_separate_workbooks(smart, workbooks):
+    prices_path, scores_path = workbooks
+    # The trailing "-f ..." mimics the argument a Jupyter/Colab kernel adds
+    completed = subprocess.run(
+        [sys.executable, str(SCRIPT), "--check-service", prices_path, "--scores", scores_path,
+         "--thresholds", "100", "125", "-f", "kernel.json"],
+        cwd=ROOT, capture_output=True, text=True, timeout=120
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert "Service check passed" in completed.stdout
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+
+def full_calculation(smart, prices_data, scores_data, seuil, benchmark):
+    result = smart.calculate_complete_smart_cac(
+        smart.clean_price_data(prices_data, benchmark=benchmark),
+        scores_data, seuil=seuil, verbose=False, benchmark=benchmark
+    )
+    return result["dataframe"].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 20, 1000])
+@pytest.mark.parametrize("seuil,benchmark", [(100, "CAC 40"), (140, "SBF 120")])
+def test_stream_matches_full_calculation(smart, prices_data, scores_data, chunksize, seuil, benchmark):
+    expected = full_calculation(smart, prices_data, scores_data, seuil, benchmark)
+    chunks = (prices_data.iloc[i:i + chunksize] for i in range(0, len(prices_data), chunksize))
+    streamed = pd.concat(
+        smart.calculate_smart_cac_stream(chunks, scores_data, seuil=seuil, verbose=False, benchmark=benchmark),
+        ignore_index=True
+    )
+    pd.testing.assert_frame_equal(expected, streamed, check_dtype=False)
+
+
+def test_stream_from_csv_matches_full_calculation(smart, tmp_path, prices_data, scores_data):
+    path = tmp_path / "prices.csv"
+    prices_data.to_csv(path, index=False)
+    expected = full_calculation(smart, prices_data, scores_data, 110, "CAC 40")
+    streamed = pd.concat(
+        smart.calculate_smart_cac_stream(smart.read_price_chunks(path, chunksize=13), scores_data,
+                                         seuil=110, verbose=False),
+        ignore_index=True
+    )
+    pd.testing.assert_frame_equal(expected, streamed, check_dtype=False)
+
+
+def test_read_price_chunks_keeps_naive_dates(smart, tmp_path):
+    path = tmp_path / "naive.csv"
+    pd.DataFrame({"Date": ["2024-01-01 00:00", "2024-07-01 09:30"], "A": [1, 2]}).to_csv(path, index=False)
+    chunk = next(smart.read_price_chunks(path, tz="Europe/Paris"))
+    assert list(chunk["Date"]) == [pd.Timestamp("2024-01-01 00:00"), pd.Timestamp("2024-07-01 09:30")]
+
+
+def test_read_price_chunks_converts_utc_offsets(smart, tmp_path):
+    path = tmp_path / "offsets.csv"
+    pd.DataFrame({"Date": ["2024-01-01 09:00+01:00", "2024-07-01 09:30+02:00"], "A": [1, 2]}).to_csv(path, index=False)
+    paris = next(smart.read_price_chunks(path, tz="Europe/Paris"))
+    utc = next(smart.read_price_chunks(path))
+    assert list(paris["Date"]) == [pd.Timestamp("2024-01-01 09:00"), pd.Timestamp("2024-07-01 09:30")]
+    assert list(utc["Date"]) == [pd.Timestamp("2024-01-01 08:00"), pd.Timestamp("2024-07-01 07:30")]
+
+
+def test_stream_rejects_timezone_aware_chunks(smart, prices_data, scores_data):
+    prices_data["Date"] = prices_data["Date"].dt.tz_localize("Europe/Paris")
+    with pytest.raises(ValueError, match="timezone-aware"):
+        list(smart.calculate_smart_cac_stream([prices_data], scores_data, verbose=False))
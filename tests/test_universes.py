@@ -0,0 +1,69 @@
+import logging
+import multiprocessing
+
+import pandas as pd
+import pytest
+
+
+def universes_for(workbooks, cac_thresholds=(100, 125), sbf_benchmark="SBF 120"):
+    prices_path, scores_path = workbooks
+    return [
+        {"name": "CAC", "prices_path": prices_path, "scores_path": scores_path, "thresholds": list(cac_thresholds)},
+        {"name": "SBF", "prices_path": prices_path, "scores_path": scores_path, "thresholds": [110],
+         "benchmark": sbf_benchmark},
+    ]
+
+
+def test_universes_share_one_workbook_across_benchmarks(smart, workbooks, prices_data, scores_data):
+    batch = smart.run_universes(universes_for(workbooks), max_workers=2)
+
+    assert batch["errors"] == {}
+    assert list(batch["summary"]["Universe"]) == ["CAC", "CAC", "SBF"]
+    assert list(batch["summary"]["Benchmark"]) == ["CAC 40", "CAC 40", "SBF 120"]
+    assert list(batch["dataframe"].columns) == ["Universe", "Seuil", "Date", "Benchmark", "SMART CAC40", "Total_Variation"]
+
+    # Cleaning once for both benchmarks gives the same index as cleaning per benchmark
+    for (name, seuil), benchmark in [(("CAC", 125), "CAC 40"), (("SBF", 110), "SBF 120")]:
+        expected = smart.calculate_complete_smart_cac(
+            smart.clean_price_data(prices_data, benchmark=benchmark), scores_data,
+            seuil=seuil, verbose=False, benchmark=benchmark
+        )
+        pd.testing.assert_frame_equal(
+            batch["results"][(name, seuil)]["dataframe"].reset_index(drop=True),
+            expected["dataframe"].reset_index(drop=True),
+            check_dtype=False
+        )
+
+
+def test_universes_reject_duplicate_names(smart, workbooks):
+    universes = universes_for(workbooks)
+    universes[1]["name"] = "CAC"
+    with pytest.raises(ValueError, match="Duplicate universe names: CAC"):
+        smart.run_universes(universes)
+
+
+def test_universes_collect_failures_per_run(smart, workbooks):
+    batch = smart.run_universes(universes_for(workbooks, sbf_benchmark="UNKNOWN"), max_workers=1)
+
+    assert set(batch["results"]) == {("CAC", 100), ("CAC", 125)}
+    assert set(batch["errors"]) == {("SBF", 110)}
+    assert list(batch["summary"]["Universe"]) == ["CAC", "CAC"]
+
+
+def test_universes_raise_when_every_run_fails(smart, workbooks):
+    universes = universes_for(workbooks, sbf_benchmark="UNKNOWN")[1:]
+    with pytest.raises(RuntimeError, match="All 1 universe runs failed"):
+        smart.run_universes(universes, max_workers=1)
+
+
+def test_universes_run_serially_when_spawned_workers_cannot_import(smart, workbooks, caplog):
+    # The tests load the script under an alias that spawned workers cannot import
+    spawn = multiprocessing.get_context("spawn")
+    assert not smart.workers_can_import_module(spawn)
+
+    with caplog.at_level(logging.WARNING):
+        batch = smart.run_universes(universes_for(workbooks), mp_context=spawn)
+
+    assert "running the universes serially" in caplog.text
+    assert batch["errors"] == {}
+    assert len(batch["results"]) == 3